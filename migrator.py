@@ -1,18 +1,107 @@
 #!/usr/bin/env python3
 
+import functools
+import io
 import os
 import sys
 import yaml
+try:
+    # libyaml-backed parser/emitter, much faster than the pure-Python one
+    from yaml import CSafeLoader as SafeLoader, CSafeDumper as SafeDumper
+except ImportError:
+    from yaml import SafeLoader, SafeDumper
 import argparse
 import shutil
 from pathlib import Path
 from typing import Dict, List, Any, Optional, Tuple
 from dataclasses import dataclass
-from jinja2 import Environment, FileSystemLoader, meta, Template, nodes
+from jinja2 import Environment, meta, nodes
 from jinja2.exceptions import TemplateError
 import click
 import re
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+
+# Environment used for analysis-only parsing; module-level so worker
+# processes can parse without migrator state
+_ANALYSIS_ENV = Environment()
+
+# Spans where variable references can appear ({{ ... }} and {% ... %});
+# renames are confined to these so HTML text and comments stay untouched
+_JINJA_TAG_RE = re.compile(r'\{\{.*?\}\}|\{%.*?%\}', re.DOTALL)
+
+# Block tags with their contents, matching an optional name on endblock
+_BLOCK_RE = re.compile(
+    r'{%\s*block\s+(\w+)\s*%}(.*?){%\s*endblock\s*(?:\s+\1)?\s*%}',
+    re.DOTALL
+)
+
+# Migration comment appended to every generated template
+_FOOTER_TPL = (
+    "<!-- Migrated template -->\n"
+    "<!-- Original: {orig} -->\n"
+    "<!-- Variables: {vars} -->"
+)
+
+
+def _extract_blocks_content(source: str) -> Dict[str, str]:
+    """Extract block contents from template source"""
+    blocks = {}
+
+    for match in _BLOCK_RE.finditer(source):
+        block_name = match.group(1)
+        block_content = match.group(2).strip()
+        blocks[block_name] = block_content
+
+    return blocks
+
+
+def _parse_template_info(source_dir: str, template_path: str,
+                         want_refs: bool = False,
+                         source: Optional[str] = None) -> Dict[str, Any]:
+    """Parse a template file and extract variables, blocks and references.
+
+    Top-level function (no migrator state) so it can run in worker processes.
+    extends/includes are only collected when want_refs is set; migration
+    itself never reads them. Pass source to parse preloaded content
+    without touching disk.
+    """
+    if source is None:
+        source = (Path(source_dir) / template_path).read_text(encoding='utf-8')
+
+    # Parse template to get AST
+    ast = _ANALYSIS_ENV.parse(source)
+
+    # Extract variables
+    variables = meta.find_undeclared_variables(ast)
+
+    # Extract blocks (and references if requested) in one traversal
+    blocks = []
+    extends = None
+    includes = []
+
+    if want_refs:
+        for node in ast.find_all((nodes.Block, nodes.Extends, nodes.Include)):
+            if isinstance(node, nodes.Block):
+                blocks.append(node.name)
+            elif isinstance(node, nodes.Extends):
+                if hasattr(node.template, 'value'):
+                    extends = node.template.value
+            elif hasattr(node.template, 'value'):
+                includes.append(node.template.value)
+    else:
+        for node in ast.find_all(nodes.Block):
+            blocks.append(node.name)
+
+    return {
+        'variables': list(variables),
+        'blocks': blocks,
+        'block_contents': _extract_blocks_content(source),
+        'extends': extends,
+        'includes': includes,
+        'source': source
+    }
 
 
 @dataclass
@@ -31,8 +120,6 @@ class JinjaMigrator:
     
     def __init__(self, config_path: str):
         self.config = self._load_config(config_path)
-        self.source_env = Environment(loader=FileSystemLoader(self.config.source_dir))
-        self.target_env = Environment(loader=FileSystemLoader(self.config.target_dir))
         self.migration_log = []
         
         # Runtime mappings (discovered interactively or automatically)
@@ -41,12 +128,53 @@ class JinjaMigrator:
         self.block_mappings = {}
         self.discovered_variables = set()
         self.discovered_blocks = set()
-        
+
+        # Sorted views of the discovered sets, fixed after analysis
+        self._sorted_vars = []
+        self._sorted_blocks = []
+
+        # Parsed template info keyed by path, validated by mtime + size
+        self._info_cache = {}
+
+        # Template sources preloaded during analysis
+        self._sources = {}
+
+        # Output directories already created during migration
+        self._created_dirs = set()
+
+        # Queued status lines, emitted in one write instead of one
+        # click.echo per message
+        self._out = []
+
+        # Compiled variable substitution regex, built lazily once
+        # mappings are finalized
+        self._var_rx = None
+        self._var_map = {}
+
+        # Compile exclusion patterns once instead of per-template
+        if self.config.exclude_patterns:
+            self._exclude_re = re.compile(
+                "|".join(f"(?:{p})" for p in self.config.exclude_patterns)
+            )
+        else:
+            self._exclude_re = None
+
+        # Extends header is identical for every generated template
+        self._header = (
+            f"{{% extends '{self.config.new_base_template}' %}}\n\n"
+            if self.config.new_base_template else ""
+        )
+
+        # Discovered templates split by exclusion, so hot loops answer
+        # _should_exclude with a set lookup instead of a regex match
+        self._included_templates = set()
+        self._excluded_templates = set()
+
     def _load_config(self, config_path: str) -> MigrationConfig:
         """Load migration configuration from YAML file"""
         try:
             with open(config_path, 'r', encoding='utf-8') as f:
-                config_data = yaml.safe_load(f)
+                config_data = yaml.load(f, Loader=SafeLoader)
             
             return MigrationConfig(
                 source_dir=config_data['source_dir'],
@@ -60,55 +188,49 @@ class JinjaMigrator:
             click.echo(f"❌ Error loading config: {e}", err=True)
             sys.exit(1)
     
+    def _log(self, msg: str) -> None:
+        """Queue a status line for batched output"""
+        self._out.append(msg)
+
+    def flush_log(self) -> None:
+        """Emit all queued status lines with a single write"""
+        if self._out:
+            click.echo("\n".join(self._out))
+            self._out.clear()
+
     def _should_exclude(self, template_path: str) -> bool:
         """Check if template should be excluded from migration"""
-        for pattern in self.config.exclude_patterns:
-            if re.match(pattern, template_path):
-                return True
-        return False
+        if template_path in self._excluded_templates:
+            return True
+        if template_path in self._included_templates:
+            return False
+        # Path not seen by discovery (e.g. passed via --template)
+        return self._exclude_re is not None and self._exclude_re.match(template_path) is not None
     
     def _extract_template_info(self, template_path: str) -> Dict[str, Any]:
         """Extract information from existing template"""
         try:
-            # Read the source file directly
             source_file = Path(self.config.source_dir) / template_path
-            with open(source_file, 'r', encoding='utf-8') as f:
-                source = f.read()
-            
-            # Parse template to get AST
-            ast = self.source_env.parse(source)
-            
-            # Extract variables
-            variables = meta.find_undeclared_variables(ast)
-            
-            # Extract blocks
-            blocks = []
-            for node in ast.find_all(nodes.Block):
-                blocks.append(node.name)
-            
-            # Extract extends/includes
-            extends = None
-            includes = []
-            
-            for node in ast.find_all(nodes.Extends):
-                if hasattr(node.template, 'value'):
-                    extends = node.template.value
-            
-            for node in ast.find_all(nodes.Include):
-                if hasattr(node.template, 'value'):
-                    includes.append(node.template.value)
-            
+
+            # Reuse cached info if the file is unchanged (mtime + size),
+            # so analysis and migration parse each template only once
+            stat = os.stat(source_file)
+            cached = self._info_cache.get(template_path)
+            if cached is not None and cached[0] == (stat.st_mtime, stat.st_size):
+                return cached[1]
+
+            # A cache miss means the file changed since analysis (or was
+            # never analyzed), so any preloaded source is stale — drop it
+            # and re-read from disk
+            self._sources.pop(template_path, None)
+            info = _parse_template_info(self.config.source_dir, template_path)
+
             # Update discovered sets
-            self.discovered_variables.update(variables)
-            self.discovered_blocks.update(blocks)
-            
-            return {
-                'variables': list(variables),
-                'blocks': blocks,
-                'extends': extends,
-                'includes': includes,
-                'source': source
-            }
+            self.discovered_variables.update(info['variables'])
+            self.discovered_blocks.update(info['blocks'])
+
+            self._info_cache[template_path] = ((stat.st_mtime, stat.st_size), info)
+            return info
         except TemplateError as e:
             click.echo(f"⚠️  Error parsing template {template_path}: {e}")
             return {}
@@ -117,7 +239,10 @@ class JinjaMigrator:
         """Interactively determine new template path"""
         if template_path in self.template_mappings:
             return self.template_mappings[template_path]
-        
+
+        # Show any queued status before prompting so interactive output
+        # stays in order
+        self.flush_log()
         click.echo(f"\n📄 Template: {template_path}")
         
         # Suggest automatic mapping
@@ -146,23 +271,27 @@ class JinjaMigrator:
         self.template_mappings[template_path] = new_path
         return new_path
     
-    def _suggest_template_path(self, template_path: str) -> str:
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def _suggest_template_path(template_path: str) -> str:
         """Suggest new template path based on common patterns"""
-        # Simple suggestions based on common patterns
+        # Pure function of the path, so suggestions are memoized; callers
+        # ask for the same path several times per run
         path = Path(template_path)
-        
+        lowered = template_path.lower()
+
         # If it's in root, suggest moving to pages/
         if len(path.parts) == 1 and path.stem != 'base':
             return f"pages/{template_path}"
-        
+
         # If it contains 'admin', suggest admin/ folder
-        if 'admin' in template_path.lower():
+        if 'admin' in lowered:
             return f"admin/{path.name}"
-        
-        # If it contains 'user', suggest user/ folder  
-        if 'user' in template_path.lower():
+
+        # If it contains 'user', suggest user/ folder
+        if 'user' in lowered:
             return f"user/{path.name}"
-        
+
         # Otherwise keep the same
         return template_path
     
@@ -174,13 +303,13 @@ class JinjaMigrator:
             return
         
         click.echo(f"\n🔧 Found {len(self.discovered_variables)} unique variables:")
-        for var in sorted(self.discovered_variables):
+        for var in self._sorted_vars:
             click.echo(f"  - {var}")
         
         if not click.confirm("\nWould you like to rename any variables?"):
             return
         
-        for var in sorted(self.discovered_variables):
+        for var in self._sorted_vars:
             new_name = click.prompt(
                 f"Rename '{var}' to (press Enter to keep unchanged)", 
                 default="", 
@@ -209,7 +338,7 @@ class JinjaMigrator:
             return
         
         click.echo(f"\n🧱 Found {len(self.discovered_blocks)} unique blocks:")
-        for block in sorted(self.discovered_blocks):
+        for block in self._sorted_blocks:
             click.echo(f"  - {block}")
         
         if self.config.auto_preserve_blocks:
@@ -228,7 +357,7 @@ class JinjaMigrator:
             click.echo("✅ Auto-mapped common blocks")
         
         if click.confirm("\nWould you like to customize block mappings?"):
-            for block in sorted(self.discovered_blocks):
+            for block in self._sorted_blocks:
                 current_mapping = self.block_mappings.get(block, block)
                 new_name = click.prompt(
                     f"Map block '{block}' to", 
@@ -239,85 +368,122 @@ class JinjaMigrator:
     
     def _generate_new_template(self, template_info: Dict[str, Any], template_path: str) -> str:
         """Generate new template content based on discovered mappings"""
-        lines = []
-        
-        # Add extends directive
-        if self.config.new_base_template:
-            lines.append(f"{{% extends '{self.config.new_base_template}' %}}")
-            lines.append("")
-        
-        # Add blocks with mapped names
-        original_blocks = self._extract_blocks_content(template_info['source'])
-        
-        for block_name, block_content in original_blocks.items():
+        # Precomputed extends directive
+        parts = [self._header]
+
+        # Add blocks with mapped names, already extracted during parsing
+        for block_name, block_content in template_info['block_contents'].items():
             new_block_name = self.block_mappings.get(block_name, block_name)
-            lines.append(f"{{% block {new_block_name} %}}")
-            
+
             # Apply variable mappings to block content
             migrated_content = self._apply_variable_mappings(block_content)
-            lines.append(migrated_content)
-            
-            lines.append("{% endblock %}")
-            lines.append("")
-        
+            parts.append(f"{{% block {new_block_name} %}}\n{migrated_content}\n{{% endblock %}}\n\n")
+
         # Add migration comments
-        lines.append("<!-- Migrated template -->")
-        lines.append(f"<!-- Original: {template_path} -->")
-        lines.append(f"<!-- Variables: {', '.join(template_info.get('variables', []))} -->")
+        parts.append(_FOOTER_TPL.format_map({
+            'orig': template_path,
+            'vars': ', '.join(template_info.get('variables', []))
+        }))
         if self.variable_mappings:
-            lines.append(f"<!-- Variable mappings: {self.variable_mappings} -->")
-        
-        return "\n".join(lines)
-    
-    def _extract_blocks_content(self, source: str) -> Dict[str, str]:
-        """Extract block contents from template source"""
-        blocks = {}
-        
-        # Improved regex pattern to extract blocks with proper nesting
-        block_pattern = r'{%\s*block\s+(\w+)\s*%}(.*?){%\s*endblock\s*(?:\s+\1)?\s*%}'
-        matches = re.finditer(block_pattern, source, re.DOTALL)
-        
-        for match in matches:
-            block_name = match.group(1)
-            block_content = match.group(2).strip()
-            blocks[block_name] = block_content
-        
-        return blocks
+            parts.append(f"\n<!-- Variable mappings: {self.variable_mappings} -->")
+
+        return "".join(parts)
     
     def _apply_variable_mappings(self, content: str) -> str:
         """Apply variable name mappings to content"""
-        for old_var, new_var in self.variable_mappings.items():
-            # Replace variable references in various Jinja contexts
-            patterns = [
-                rf'\b{re.escape(old_var)}\b',  # Simple variable
-                rf'{{\s*{re.escape(old_var)}\s*}}',  # Template variable
-                f'{{% [^%]*\\b{re.escape(old_var)}\\b[^%]*%}}',  # In control structures
-            ]
-            
-            for pattern in patterns:
-                content = re.sub(pattern, new_var, content)
-        
-        return content
+        if not self.variable_mappings:
+            return content
+
+        # Compile a single alternation over all variable names on first
+        # use; mappings are final by the time migration starts. One scan
+        # of the content replaces the per-variable substitution loop.
+        if self._var_rx is None:
+            self._var_rx = re.compile(
+                r'\b(' + '|'.join(re.escape(v) for v in self.variable_mappings) + r')\b'
+            )
+            self._var_map = dict(self.variable_mappings)
+
+        rename = lambda m: self._var_map[m.group(1)]
+        return _JINJA_TAG_RE.sub(
+            lambda tag: self._var_rx.sub(rename, tag.group(0)), content
+        )
     
     def discover_templates(self) -> List[str]:
         """Discover all templates in source directory"""
-        templates = []
-        source_path = Path(self.config.source_dir)
-        
-        for template_file in source_path.rglob("*.html"):
-            relative_path = template_file.relative_to(source_path)
-            templates.append(str(relative_path))
-        
-        return sorted(templates)
+        source_dir = self.config.source_dir
+
+        # A missing source directory means no templates, not a traceback;
+        # main reports "No templates found to migrate"
+        if not os.path.isdir(source_dir):
+            return []
+
+        # os.scandir walk avoids the per-entry Path and stat overhead of
+        # Path.rglob on large template trees
+        def walk(directory):
+            with os.scandir(directory) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        yield from walk(entry.path)
+                    elif entry.name.endswith('.html'):
+                        yield os.path.relpath(entry.path, source_dir)
+
+        templates = sorted(walk(source_dir))
+
+        # Classify each template against the exclusion regex exactly once
+        if self._exclude_re is not None:
+            self._excluded_templates = {
+                t for t in templates if self._exclude_re.match(t)
+            }
+        self._included_templates = set(templates) - self._excluded_templates
+
+        return templates
     
     def analyze_all_templates(self, templates: List[str]) -> None:
         """Analyze all templates to discover variables and blocks"""
         click.echo("🔍 Analyzing templates...")
-        
-        for template_path in templates:
-            if not self._should_exclude(template_path):
-                self._extract_template_info(template_path)
-        
+
+        to_parse = [t for t in templates if not self._should_exclude(t)]
+        source_dir = Path(self.config.source_dir)
+
+        # Preload all sources with threaded I/O so the parse stage is fed
+        # from memory instead of blocking on disk per file
+        with ThreadPoolExecutor(max_workers=32) as pool:
+            read_futures = {
+                pool.submit((source_dir / t).read_text, encoding='utf-8'): t
+                for t in to_parse
+            }
+            for future in as_completed(read_futures):
+                template_path = read_futures[future]
+                try:
+                    self._sources[template_path] = future.result()
+                except OSError as e:
+                    click.echo(f"⚠️  Error reading template {template_path}: {e}")
+
+        # Jinja parsing is CPU-bound, so parse templates in worker
+        # processes and merge results (and the info cache) in the parent
+        with ProcessPoolExecutor(max_workers=os.cpu_count()) as pool:
+            futures = {
+                pool.submit(_parse_template_info, self.config.source_dir, t,
+                            source=self._sources[t]): t
+                for t in to_parse if t in self._sources
+            }
+            for future in as_completed(futures):
+                template_path = futures[future]
+                try:
+                    info = future.result()
+                    stat = os.stat(source_dir / template_path)
+                except (TemplateError, OSError) as e:
+                    click.echo(f"⚠️  Error parsing template {template_path}: {e}")
+                    continue
+
+                self.discovered_variables.update(info['variables'])
+                self.discovered_blocks.update(info['blocks'])
+                self._info_cache[template_path] = ((stat.st_mtime, stat.st_size), info)
+
+        # Sort once; the interactive flows iterate these repeatedly
+        self._sorted_vars = sorted(self.discovered_variables)
+        self._sorted_blocks = sorted(self.discovered_blocks)
+
         click.echo(f"Found {len(self.discovered_variables)} variables and {len(self.discovered_blocks)} blocks")
     
     def configure_mappings_interactively(self) -> None:
@@ -346,16 +512,16 @@ class JinjaMigrator:
         """Migrate a single template"""
         try:
             if self._should_exclude(template_path):
-                click.echo(f"⏭️  Skipping excluded template: {template_path}")
+                self._log(f"⏭️  Skipping excluded template: {template_path}")
                 return True
-            
+
             # Get target path interactively
             target_path = self._interactive_template_mapping(template_path)
             if target_path is None:
-                click.echo(f"⏭️  Skipping template: {template_path}")
+                self._log(f"⏭️  Skipping template: {template_path}")
                 return True
-            
-            click.echo(f"📄 Migrating: {template_path} → {target_path}")
+
+            self._log(f"📄 Migrating: {template_path} → {target_path}")
             
             # Extract template information
             template_info = self._extract_template_info(template_path)
@@ -365,11 +531,14 @@ class JinjaMigrator:
             # Generate new template content
             new_content = self._generate_new_template(template_info, template_path)
             
-            # Write new template
+            # Write new template, creating each output directory only once
             full_output_path = Path(self.config.target_dir) / target_path
-            full_output_path.parent.mkdir(parents=True, exist_ok=True)
-            
-            with open(full_output_path, 'w', encoding='utf-8') as f:
+            parent_dir = full_output_path.parent
+            if parent_dir not in self._created_dirs:
+                parent_dir.mkdir(parents=True, exist_ok=True)
+                self._created_dirs.add(parent_dir)
+
+            with open(full_output_path, 'w', encoding='utf-8', buffering=1 << 16) as f:
                 f.write(new_content)
             
             self.migration_log.append({
@@ -379,56 +548,46 @@ class JinjaMigrator:
                 'blocks': template_info.get('blocks', [])
             })
             
-            click.echo(f"✅ Migrated successfully")
+            self._log(f"✅ Migrated successfully")
             return True
-            
+
         except Exception as e:
-            click.echo(f"❌ Error migrating {template_path}: {e}")
+            self._log(f"❌ Error migrating {template_path}: {e}")
             return False
     
     def generate_migration_report(self) -> str:
         """Generate migration report"""
-        report_lines = [
-            "# Jinja Template Migration Report",
-            f"## Configuration",
-            f"- Source Directory: {self.config.source_dir}",
-            f"- Target Directory: {self.config.target_dir}", 
-            f"- New Base Template: {self.config.new_base_template}",
-            "",
-            "## Applied Mappings",
-        ]
-        
+        buf = io.StringIO()
+        buf.write(
+            "# Jinja Template Migration Report\n"
+            "## Configuration\n"
+            f"- Source Directory: {self.config.source_dir}\n"
+            f"- Target Directory: {self.config.target_dir}\n"
+            f"- New Base Template: {self.config.new_base_template}\n"
+            "\n"
+            "## Applied Mappings\n"
+        )
+
         if self.variable_mappings:
-            report_lines.extend([
-                "### Variable Mappings",
-                "| Original | New |",
-                "|----------|-----|"
-            ])
-            for old, new in self.variable_mappings.items():
-                report_lines.append(f"| {old} | {new} |")
-            report_lines.append("")
-        
+            buf.write("### Variable Mappings\n| Original | New |\n|----------|-----|\n")
+            buf.write("\n".join(f"| {old} | {new} |" for old, new in self.variable_mappings.items()))
+            buf.write("\n\n")
+
         if self.block_mappings:
-            report_lines.extend([
-                "### Block Mappings", 
-                "| Original | New |",
-                "|----------|-----|"
-            ])
-            for old, new in self.block_mappings.items():
-                report_lines.append(f"| {old} | {new} |")
-            report_lines.append("")
-        
-        report_lines.append("## Migrated Templates")
-        
+            buf.write("### Block Mappings\n| Original | New |\n|----------|-----|\n")
+            buf.write("\n".join(f"| {old} | {new} |" for old, new in self.block_mappings.items()))
+            buf.write("\n\n")
+
+        buf.write("## Migrated Templates")
+
         for entry in self.migration_log:
-            report_lines.extend([
-                f"### {entry['source']} → {entry['target']}",
-                f"- Variables: {', '.join(entry['variables']) or 'None'}",
-                f"- Blocks: {', '.join(entry['blocks']) or 'None'}",
-                ""
-            ])
-        
-        return "\n".join(report_lines)
+            buf.write(
+                f"\n### {entry['source']} → {entry['target']}\n"
+                f"- Variables: {', '.join(entry['variables']) or 'None'}\n"
+                f"- Blocks: {', '.join(entry['blocks']) or 'None'}\n"
+            )
+
+        return buf.getvalue()
 
 
 @click.command()
@@ -487,8 +646,7 @@ def main(config: str, dry_run: bool, template: tuple, report: bool, auto: bool):
             migrator._interactive_block_mapping()  # This will auto-map
     
     click.echo(f"\nFound {len(templates_to_migrate)} template(s) to migrate:")
-    for t in templates_to_migrate:
-        click.echo(f"  - {t}")
+    click.echo("\n".join(f"  - {t}" for t in templates_to_migrate))
     
     if dry_run:
         click.echo("\n🔍 DRY RUN MODE - No files will be modified")
@@ -516,7 +674,9 @@ def main(config: str, dry_run: bool, template: tuple, report: bool, auto: bool):
             successful += 1
         else:
             failed += 1
-    
+
+    migrator.flush_log()
+
     # Summary
     click.echo(f"\n📊 Migration Summary:")
     click.echo(f"✅ Successful: {successful}")
@@ -548,7 +708,7 @@ def create_sample_config(config_path: str):
     }
     
     with open(config_path, 'w', encoding='utf-8') as f:
-        yaml.dump(sample_config, f, default_flow_style=False, allow_unicode=True)
+        yaml.dump(sample_config, f, Dumper=SafeDumper, default_flow_style=False, allow_unicode=True)
 
 
 if __name__ == '__main__':